@@ -3,12 +3,20 @@ import os
 import subprocess
 import sys
 import shutil
-import uuid
 import platform
 import time
 from pathlib import Path
-import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import glob
+import tempfile
+import codecs
+import hashlib
+import json
+import fcntl
+import importlib.metadata
+import selectors
+import struct
+from collections import deque
 
 # Set page configuration
 st.set_page_config(
@@ -23,26 +31,224 @@ if 'compilation_results' not in st.session_state:
 if 'show_results' not in st.session_state:
     st.session_state.show_results = False
 
+# Directories the app works in. Recomputed on every rerun; these are only string joins.
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_ROOT = os.path.join(APP_DIR, "compiled_output")
+
+# Where system tools such as gcc and patchelf normally live
+COMMON_BIN_DIRS = ("/usr/bin", "/usr/local/bin", "/bin")
+
+# Nuitka invocation shared by every compilation mode
+NUITKA_BASE_CMD = (
+    sys.executable, "-m", "nuitka",
+    "--show-progress",
+    "--no-progressbar",  # Output goes to a pipe, the redrawn bar only bloats the log
+    "--remove-output",
+    "--assume-yes-for-downloads",  # Auto-download missing dependencies
+    "--python-flag=no_site",  # Reduce dependencies
+    "--lto=no",  # LTO's serial link step is slow and can OOM small cloud runners
+)
+
+# Compilation modes, built once; only the mode-specific flags differ.
+# The UI offers exactly these keys, so an unknown mode cannot be selected.
+COMPILE_MODES = {
+    "max_compatibility": {
+        "name": "Maximum Compatibility Binary",
+        "label": "Maximum Compatibility (Recommended)",
+        "flags": (
+            "--standalone",
+            "--onefile",  # Single portable file
+            "--follow-imports",
+        ),
+        "creates_runner": False
+    },
+    "portable": {
+        "name": "Portable Non-Standalone",
+        "label": "Portable Binary",
+        "flags": (),
+        "creates_runner": False
+    },
+    "standalone": {
+        "name": "Standalone Binary",
+        "label": "Standalone Binary",
+        "flags": (
+            "--standalone",
+            "--onefile",
+        ),
+        "creates_runner": False
+    }
+}
+
+# Compiler caches shared by every job, so later builds reuse earlier object files
+CACHE_DIR = os.path.join(APP_DIR, ".nuitka_cache")
+# Successful builds by content hash, kept across app restarts
+BUILD_CACHE_DIR = os.path.join(CACHE_DIR, "builds")
+# Content hash of the requirements file pip last installed successfully
+PIP_MARKER_PATH = os.path.join(CACHE_DIR, "pip-last-installed")
+
+@st.cache_resource(show_spinner=False)
+def get_subprocess_envs():
+    """Process-wide environments for the Nuitka, apt and pip subprocesses"""
+    # Streamlit re-executes this script on every rerun, so the environments
+    # are built here once per process rather than at module level
+    return {
+        # Compiler caches shared by every job
+        "nuitka": {
+            **os.environ,
+            "CCACHE_DIR": os.environ.get("CCACHE_DIR", os.path.join(CACHE_DIR, "ccache")),
+            "NUITKA_CACHE_DIR": os.environ.get("NUITKA_CACHE_DIR", CACHE_DIR),
+        },
+        # Installers skip interactive prompts and startup network checks;
+        # pip keeps its download and wheel cache next to the compiler caches
+        "apt": {
+            **os.environ,
+            "DEBIAN_FRONTEND": "noninteractive",
+            "APT_LISTCHANGES_FRONTEND": "none",
+        },
+        "pip": {
+            **os.environ,
+            "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+            "PIP_NO_PYTHON_VERSION_WARNING": "1",
+            "PIP_CACHE_DIR": os.environ.get("PIP_CACHE_DIR", os.path.join(CACHE_DIR, "pip")),
+        },
+    }
+
+@st.cache_resource(show_spinner=False)
+def prepare_shared_dirs():
+    """Create the shared output and cache directories once per process"""
+    nuitka_env = get_subprocess_envs()["nuitka"]
+    for shared_dir in (OUTPUT_ROOT, BUILD_CACHE_DIR, nuitka_env["CCACHE_DIR"], nuitka_env["NUITKA_CACHE_DIR"]):
+        ensure_dir(shared_dir)
+    return True
+
+def build_nuitka_flags(compilation_mode, use_static_libpython=False, use_clang=False):
+    """Build the Nuitka command line for a compilation mode, without the per-job paths"""
+    flags = [
+        *NUITKA_BASE_CMD,
+        *COMPILE_MODES[compilation_mode]["flags"]
+    ]
+    # Use static libpython only if available, otherwise use best portable options
+    if use_static_libpython:
+        flags.append("--static-libpython=yes")
+    if use_clang:
+        flags.append("--clang")
+    return flags
+
+def build_nuitka_cmd(compilation_mode, script_path, output_dir, use_static_libpython=False, use_clang=False):
+    """Build the Nuitka command line for a compilation mode"""
+    return [
+        *build_nuitka_flags(compilation_mode, use_static_libpython, use_clang),
+        script_path,
+        f"--output-dir={output_dir}"
+    ]
+
+def compute_build_key(*inputs):
+    """Hash the compilation inputs into a short cache key"""
+    digest = hashlib.blake2b(digest_size=8)
+    for value in inputs:
+        digest.update(str(value).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+@st.cache_resource(show_spinner=False)
+def get_installed_packages():
+    """Process-wide set of system packages installed by earlier jobs"""
+    return set()
+
+def load_cached_build(build_key):
+    """Load a successful compilation result from the on-disk build cache"""
+    result_path = os.path.join(BUILD_CACHE_DIR, build_key, "result.json")
+    try:
+        with open(result_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def store_cached_build(build_key, result):
+    """Store a successful compilation result in the on-disk build cache"""
+    cache_dir = os.path.join(BUILD_CACHE_DIR, build_key)
+    ensure_dir(cache_dir)
+    
+    # Serialize concurrent sessions storing the same build
+    with open(os.path.join(cache_dir, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        
+        cached_binary_path = os.path.join(cache_dir, os.path.basename(result['binary_path']))
+        if not os.path.exists(cached_binary_path):
+            try:
+                os.link(result['binary_path'], cached_binary_path)
+            except OSError:
+                shutil.copy2(result['binary_path'], cached_binary_path)
+        
+        # result.json is replaced atomically after the binary is in place,
+        # so readers never see a result without its binary
+        cached_result = {**result, 'binary_path': cached_binary_path}
+        write_if_changed(os.path.join(cache_dir, "result.json"), json.dumps(cached_result))
+    
+    return cached_result
+
 def ensure_dir(dir_path):
     """Ensure directory exists"""
     Path(dir_path).mkdir(parents=True, exist_ok=True)
 
-def check_dependencies():
-    """Check if required dependencies are available"""
-    missing_deps = []
-    
-    # Check for patchelf
-    result = subprocess.run(["which", "patchelf"], capture_output=True)
-    if result.returncode != 0:
-        missing_deps.append("patchelf")
+def write_if_changed(file_path, content):
+    """Atomically write text content to a file, skipping the write if unchanged"""
+    data = content.encode("utf-8")
+    try:
+        # Only read the old content back when the size already matches
+        if os.stat(file_path).st_size == len(data):
+            with open(file_path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        pass
     
-    # Check for gcc
-    result = subprocess.run(["which", "gcc"], capture_output=True)
-    if result.returncode != 0:
-        missing_deps.append("gcc")
+    # Raw unbuffered write, normally a single write(2) call. The temp file
+    # name is unique, so concurrent writers cannot clobber each other's.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+    try:
+        try:
+            os.fchmod(fd, 0o644)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+@st.cache_data(ttl=60, show_spinner=False)
+def find_tool(name):
+    """Locate an executable on PATH, cached across reruns"""
+    # Try the usual install locations first, a single stat each. Callers only
+    # care whether the tool exists, so PATH precedence does not matter here.
+    for bin_dir in COMMON_BIN_DIRS:
+        tool_path = os.path.join(bin_dir, name)
+        if os.path.isfile(tool_path) and os.access(tool_path, os.X_OK):
+            return tool_path
     
-    return missing_deps
+    # shutil.which scans PATH in-process instead of forking `which`
+    return shutil.which(name)
+
+def ensure_executable(file_path):
+    """Make a file executable unless it already is, returning its stat result"""
+    file_stat = os.stat(file_path)
+    if file_stat.st_mode & 0o111 != 0o111:
+        os.chmod(file_path, file_stat.st_mode | 0o755)
+    return file_stat
 
+@st.cache_data(ttl=60, show_spinner=False)
+def check_dependencies():
+    """Check if required dependencies are available"""
+    return [dep for dep in ("patchelf", "gcc") if find_tool(dep) is None]
+
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
 def check_static_libpython():
     """Check if static libpython is available"""
     try:
@@ -60,12 +266,21 @@ def check_static_libpython():
         pass
     return False
 
+@st.cache_data(show_spinner=False)
 def get_current_python_version():
     """Get the current Python version for compatibility notes"""
     return f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def get_nuitka_version():
     """Get the current Nuitka version to handle different command line options"""
+    # Read the installed package metadata in-process, rather than starting
+    # an interpreter that imports all of Nuitka just to print its version
+    try:
+        return importlib.metadata.version("nuitka")
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    
     try:
         result = subprocess.run([sys.executable, "-m", "nuitka", "--version"], 
                                 capture_output=True, text=True)
@@ -78,8 +293,11 @@ def get_nuitka_version():
     except:
         return "unknown"
 
-def compile_with_nuitka(code, requirements, packages, target_platform, compilation_mode, output_extension=".bin"):
+def compile_with_nuitka(code, requirements, packages, target_platform, compilation_mode, output_extension=".bin", use_clang=False):
     """Compile Python code with Nuitka"""
+    # No-op after the first compile in this process
+    prepare_shared_dirs()
+    
     # Create status container
     status_container = st.container()
     status_container.info("Starting compilation process...")
@@ -88,30 +306,6 @@ def compile_with_nuitka(code, requirements, packages, target_platform, compilati
     nuitka_version = get_nuitka_version()
     status_container.info(f"Using Nuitka version: {nuitka_version}")
     
-    # Check if static libpython is available
-    has_static_libpython = check_static_libpython()
-    if has_static_libpython:
-        status_container.success("✅ Static libpython detected - will use for maximum portability")
-    else:
-        status_container.warning("⚠️ Static libpython not available - using alternative portable options")
-    
-    # Check dependencies first
-    missing_deps = check_dependencies()
-    if missing_deps:
-        error_msg = f"Required dependencies are missing: {', '.join(missing_deps)}\n"
-        error_msg += "Some features may not work properly."
-        status_container.warning(error_msg)
-    
-    # Create unique ID for this compilation
-    job_id = str(uuid.uuid4())
-    base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_code")
-    job_dir = os.path.join(base_dir, job_id)
-    output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiled_output", job_id)
-    
-    # Create directories
-    ensure_dir(job_dir)
-    ensure_dir(output_dir)
-    
     # Handle Windows compilation
     if target_platform == "windows":
         error_msg = """
@@ -129,147 +323,166 @@ def compile_with_nuitka(code, requirements, packages, target_platform, compilati
             'binary_info': None
         }
     
-    # Install system packages if specified
-    packages_result = "No system packages specified."
-    if packages.strip():
-        packages_result = install_system_packages(packages, status_container)
+    # Check if static libpython is available
+    has_static_libpython = check_static_libpython()
+    if has_static_libpython:
+        status_container.success("✅ Static libpython detected - will use for maximum portability")
+    else:
+        status_container.warning("⚠️ Static libpython not available - using alternative portable options")
+    
+    # Identical inputs and Nuitka flags produce an identical binary, so reuse
+    # earlier builds from the on-disk cache
+    build_key = compute_build_key(
+        code, requirements, packages, target_platform, compilation_mode, output_extension,
+        build_nuitka_flags(compilation_mode, has_static_libpython, use_clang),
+        nuitka_version, get_current_python_version()
+    )
+    cached_result = load_cached_build(build_key)
+    if cached_result and not os.path.exists(cached_result['binary_path']):
+        cached_result = None
+    # Standalone binaries bundle their imports, so they can be reused right away
+    if cached_result and "--standalone" in COMPILE_MODES[compilation_mode]["flags"]:
+        status_container.success("✅ Identical code was already compiled - reusing the previous build")
+        return cached_result
+    
+    # Check dependencies first
+    missing_deps = check_dependencies()
+    if missing_deps:
+        error_msg = f"Required dependencies are missing: {', '.join(missing_deps)}\n"
+        error_msg += "Some features may not work properly."
+        status_container.warning(error_msg)
+    
+    # Create unique directories for this compilation; mkdtemp picks a free
+    # name and creates it in one step, so no collision check is needed.
+    # The output root is re-checked in case it was removed while running.
+    ensure_dir(OUTPUT_ROOT)
+    output_dir = tempfile.mkdtemp(prefix="job_", dir=OUTPUT_ROOT)
+    job_id = os.path.basename(output_dir)
+    # The source is only read once by Nuitka, so keep it in the temp dir
+    # (tmpfs on most hosts) rather than on the persistent app volume
+    job_dir = tempfile.mkdtemp(prefix=f"nuitka-{job_id}-")
     
     # Write code to a Python file
     script_path = os.path.join(job_dir, "user_script.py")
-    with open(script_path, "w") as f:
-        f.write(code)
+    write_if_changed(script_path, code)
     
-    # Handle requirements
-    install_result = "No Python requirements specified."
+    req_path = None
     if requirements.strip():
         req_path = os.path.join(job_dir, "requirements.txt")
-        with open(req_path, "w") as f:
-            f.write(requirements)
-        
-        try:
+        write_if_changed(req_path, requirements)
+    
+    # Install system packages and Python requirements concurrently.
+    # Both installers run off the main thread, so they only return results;
+    # all Streamlit writes happen here since elements are not thread-safe.
+    packages_result = "No system packages specified."
+    install_result = "No Python requirements specified."
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {}
+        if packages.strip():
+            status_container.info("Installing system packages...")
+            futures[executor.submit(install_system_packages, packages)] = "packages"
+        if req_path:
             status_container.info("Installing Python requirements...")
-            install_process = subprocess.run(
-                [sys.executable, "-m", "pip", "install", "--no-cache-dir", "-r", req_path],
-                capture_output=True,
-                text=True
-            )
+            futures[executor.submit(install_python_requirements, req_path)] = "requirements"
+        
+        # Report each installer as soon as it finishes, whichever comes first
+        for future in as_completed(futures):
+            if futures[future] == "packages":
+                packages_result, packages_ok = future.result()
+                if packages_ok:
+                    status_container.success("✅ System packages installed successfully.")
+                else:
+                    status_container.warning("⚠️ Some system packages could not be installed.")
+                continue
             
-            if install_process.returncode == 0:
+            try:
+                install_result, requirements_ok = future.result()
+            except Exception as e:
+                install_result = f"Error: {str(e)}"
+                status_container.error(install_result)
+                shutil.rmtree(job_dir, ignore_errors=True)
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'install_result': install_result,
+                    'compile_output': "",
+                    'binary_path': None,
+                    'binary_info': None
+                }
+            if requirements_ok:
                 status_container.success("✅ Python requirements installed successfully.")
-                install_result = "Python requirements installed successfully."
             else:
                 status_container.warning("⚠️ Python requirements installation completed with warnings.")
-                install_result = f"Installation completed with return code: {install_process.returncode}\n{install_process.stderr}"
-        except Exception as e:
-            install_result = f"Error: {str(e)}"
-            status_container.error(install_result)
-            return {
-                'success': False,
-                'error': str(e),
-                'install_result': install_result,
-                'compile_output': "",
-                'binary_path': None,
-                'binary_info': None
-            }
+    
+    # Portable binaries import their requirements from the shared
+    # site-packages when they run, so reuse them only once those are installed
+    if cached_result:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        shutil.rmtree(output_dir, ignore_errors=True)
+        status_container.success("✅ Identical code was already compiled - reusing the previous build")
+        return cached_result
     
     # Compilation
     try:
         status_container.info("🔧 Starting compilation...")
         
-        # Define compilation options with adaptive static linking
-        # Use static libpython only if available, otherwise use best portable options
-        def build_cmd(base_cmd, use_static=False):
-            if use_static and has_static_libpython:
-                base_cmd.append("--static-libpython=yes")
-            return base_cmd
-        
-        compile_options = {
-            "max_compatibility": {
-                "name": "Maximum Compatibility Binary",
-                "cmd": build_cmd([
-                    sys.executable, "-m", "nuitka",
-                    "--standalone",
-                    "--onefile",  # Single portable file
-                    "--show-progress",
-                    "--remove-output",
-                    "--follow-imports",
-                    "--assume-yes-for-downloads",  # Auto-download missing dependencies
-                    "--python-flag=no_site",  # Reduce dependencies
-                    script_path,
-                    f"--output-dir={output_dir}"
-                ], use_static=True),
-                "creates_runner": False
-            },
-            "portable": {
-                "name": "Portable Non-Standalone",
-                "cmd": build_cmd([
-                    sys.executable, "-m", "nuitka",
-                    "--show-progress",
-                    "--remove-output",
-                    "--assume-yes-for-downloads",
-                    "--python-flag=no_site",
-                    script_path,
-                    f"--output-dir={output_dir}"
-                ], use_static=True),
-                "creates_runner": False
-            },
-            "standalone": {
-                "name": "Standalone Binary",
-                "cmd": build_cmd([
-                    sys.executable, "-m", "nuitka",
-                    "--standalone",
-                    "--onefile",
-                    "--show-progress",
-                    "--remove-output",
-                    "--assume-yes-for-downloads",
-                    "--python-flag=no_site",
-                    script_path,
-                    f"--output-dir={output_dir}"
-                ], use_static=True),
-                "creates_runner": False
-            }
-        }
-        
-        selected_option = compile_options[compilation_mode]
+        selected_option = COMPILE_MODES[compilation_mode]
+        cmd = build_nuitka_cmd(compilation_mode, script_path, output_dir, has_static_libpython, use_clang)
         status_container.info(f"Using {selected_option['name']}...")
         
         # Show command in collapsible section
         with status_container.expander(f"Command for {selected_option['name']}"):
-            st.code(' '.join(selected_option['cmd']))
+            st.code(' '.join(cmd))
         
-        # Run compilation
+        # Run compilation (unbuffered, the output is read in large raw chunks).
+        # Our fds are non-inheritable anyway, and leaving close_fds off lets
+        # subprocess launch via posix_spawn instead of forking this process.
         process = subprocess.Popen(
-            selected_option['cmd'],
+            cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+            bufsize=0,
+            close_fds=False,
+            env=get_subprocess_envs()["nuitka"]
         )
         
         # Progress tracking
         progress_bar = st.progress(0)
         log_placeholder = st.empty()
-        compile_output = ""
-        line_count = 0
+        output_lines = []
+        log_tail = deque(maxlen=20)
+        last_flush = 0.0
+        last_progress = 0
         
-        # Real-time progress display
-        for line in iter(process.stdout.readline, ''):
-            compile_output += line
-            line_count += 1
-            
-            # Update progress
-            progress = min(line_count / 200, 0.99)
-            progress_bar.progress(progress)
-            
+        def show_log():
             # Show formatted log (last 20 lines)
-            lines = compile_output.splitlines()
-            formatted_log = '\n'.join(lines[-20:])
             with log_placeholder.container():
                 with st.expander("📋 Compilation Log", expanded=False):
-                    st.text(formatted_log)
+                    st.text('\n'.join(log_tail))
         
-        progress_bar.progress(1.0)
+        # Real-time progress display, redrawn at most every 200 ms rather than
+        # per line. Each redraw sends only the 20-line tail, not the whole log.
+        for lines in iter_output_lines(process.stdout):
+            output_lines.extend(lines)
+            log_tail.extend(lines)
+            
+            now = time.monotonic()
+            if now - last_flush >= 0.2:
+                last_flush = now
+                
+                # Update progress, skipping redraws that would not move the bar
+                progress = min(len(output_lines) * 100 // 200, 99)
+                if progress != last_progress:
+                    last_progress = progress
+                    progress_bar.progress(progress)
+                show_log()
+        
+        show_log()
+        
+        # Join the full log once, rather than growing one string per chunk
+        compile_output = "\n".join(output_lines)
+        
+        progress_bar.progress(100)
         process.wait()
         
         status_container.info(f"Compilation finished with exit code: {process.returncode}")
@@ -278,47 +491,30 @@ def compile_with_nuitka(code, requirements, packages, target_platform, compilati
         output_filename = f"user_script{output_extension}"
         binary_path = find_compiled_binary(output_dir, output_filename)
         
-        # If not found with expected extension, try finding any executable
-        if not binary_path:
-            # Try common executable patterns for onefile
-            patterns = [
-                os.path.join(output_dir, "user_script"),
-                os.path.join(output_dir, "user_script.bin"),
-                os.path.join(output_dir, "**", "user_script"),
-                os.path.join(output_dir, "**", "*.bin"),
-            ]
-            
-            for pattern in patterns:
-                matches = glob.glob(pattern, recursive=True)
-                if matches:
-                    binary_path = matches[0]
-                    break
-        
         if process.returncode == 0 and binary_path:
             # Check if it's really a binary file
-            file_process = subprocess.run(["file", binary_path], capture_output=True, text=True)
-            binary_info = file_process.stdout
+            binary_info = identify_binary(binary_path)
             
             # Check linking type
-            ldd_process = subprocess.run(["ldd", binary_path], capture_output=True, text=True)
-            if "not a dynamic executable" in ldd_process.stderr or "statically linked" in ldd_process.stdout:
+            elf_dependencies = read_elf_dependencies(binary_path)
+            if elf_dependencies is None:
+                linking_info = "ℹ️ Compiled binary - should work on compatible systems"
+            elif not elf_dependencies[0]:
                 linking_info = "✅ Statically linked - fully portable!"
             else:
                 # Check what dynamic libraries are required
-                if ldd_process.returncode == 0:
-                    libs = ldd_process.stdout.count("=>")
-                    linking_info = f"🔗 Dynamically linked ({libs} libraries) - designed for maximum compatibility"
-                else:
-                    linking_info = "ℹ️ Compiled binary - should work on compatible systems"
+                libs = elf_dependencies[1]
+                linking_info = f"🔗 Dynamically linked ({libs} libraries) - designed for maximum compatibility"
             
             # Rename to desired extension
             if output_extension in ['.bin', '.sh'] and not binary_path.endswith(output_extension):
+                # Same directory, hence same filesystem: always a plain rename
                 new_binary_path = binary_path + output_extension
-                shutil.move(binary_path, new_binary_path)
+                os.replace(binary_path, new_binary_path)
                 binary_path = new_binary_path
             
             # Make executable
-            os.chmod(binary_path, 0o755)
+            file_size = ensure_executable(binary_path).st_size
             
             # Current Python version info
             current_python = get_current_python_version()
@@ -330,7 +526,7 @@ Compilation Details:
 - Nuitka Version: {nuitka_version}
 - Exit Code: {process.returncode}
 - Output Path: {binary_path}
-- File Size: {os.path.getsize(binary_path) / 1024:.2f} KB
+- File Size: {file_size / 1024:.2f} KB
 - Compiled with Python: {current_python}
 - Static Libpython Available: {'Yes' if has_static_libpython else 'No'}
 - Linking: {linking_info}
@@ -349,12 +545,13 @@ PORTABILITY NOTES:
 """
             
             status_container.success(f"✅ {selected_option['name']} compilation successful!")
-            return {
+            result = {
                 'success': True,
                 'install_result': result_summary,
                 'compile_output': compile_output,
                 'binary_path': binary_path,
                 'binary_info': binary_info,
+                'file_size': file_size,
                 'output_extension': output_extension,
                 'compilation_mode': compilation_mode,
                 'python_version': current_python,
@@ -362,6 +559,12 @@ PORTABILITY NOTES:
                 'linking_info': linking_info,
                 'has_static_libpython': has_static_libpython
             }
+            try:
+                result = store_cached_build(build_key, result)
+            except OSError:
+                # A failed cache write only costs a rebuild next time
+                pass
+            return result
         else:
             return {
                 'success': False,
@@ -382,70 +585,142 @@ PORTABILITY NOTES:
             'binary_path': None,
             'binary_info': "Compilation error"
         }
+    finally:
+        # Nuitka has exited, so the staged source is no longer needed
+        shutil.rmtree(job_dir, ignore_errors=True)
 
-def install_system_packages(packages_content, status_container):
-    """Install system packages from packages.txt content"""
-    if not packages_content.strip():
-        return "No system packages specified."
+def install_system_packages(packages_content):
+    """Install system packages from packages.txt content, returning (summary, ok)"""
+    # Skip empty lines and comments
+    packages = [
+        line.strip() for line in packages_content.splitlines()
+        if line.strip() and not line.strip().startswith('#')
+    ]
+    if not packages:
+        return "No system packages specified.", True
+    
+    # Packages installed by an earlier job are still on the system
+    installed_packages = get_installed_packages()
+    already_installed = [package for package in packages if package in installed_packages]
+    packages = [package for package in packages if package not in installed_packages]
+    
+    if not packages:
+        return f"All system packages already installed: {', '.join(already_installed)}", True
     
-    # Create temporary file
-    fd, temp_path = tempfile.mkstemp(suffix='.txt')
     try:
-        with os.fdopen(fd, 'w') as tmp:
-            tmp.write(packages_content)
-        
-        status_container.info("Installing system packages...")
-        
-        # Install packages line by line
         install_log = ""
         failed_packages = []
         successful_packages = []
         
-        with open(temp_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                # Skip empty lines and comments
-                if not line or line.startswith('#'):
-                    continue
-                
-                status_container.info(f"Installing: {line}")
-                
-                # Try to install package
-                install_process = subprocess.run(
-                    ["apt-get", "update", "-qq"],
-                    capture_output=True,
-                    text=True
-                )
-                
+        # Refresh the package index once for the whole batch
+        subprocess.run(
+            ["apt-get", "update", "-qq"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=get_subprocess_envs()["apt"]
+        )
+        
+        # Install everything in one apt-get call
+        install_process = subprocess.run(
+            ["apt-get", "install", "-y", "--no-install-recommends", *packages],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=get_subprocess_envs()["apt"]
+        )
+        
+        if install_process.returncode == 0:
+            successful_packages = list(packages)
+        else:
+            # The batch failed, retry one by one to find out which packages are at fault
+            for package in packages:
                 install_process = subprocess.run(
-                    ["apt-get", "install", "-y", line],
-                    capture_output=True,
-                    text=True
+                    ["apt-get", "install", "-y", "--no-install-recommends", package],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    env=get_subprocess_envs()["apt"]
                 )
-                
                 if install_process.returncode == 0:
-                    successful_packages.append(line)
-                    install_log += f"✅ Successfully installed: {line}\n"
+                    successful_packages.append(package)
                 else:
-                    failed_packages.append(line)
-                    install_log += f"❌ Failed to install: {line}\n"
+                    failed_packages.append(package)
+        
+        installed_packages.update(successful_packages)
+        successful_packages = already_installed + successful_packages
+        
+        for package in successful_packages:
+            install_log += f"✅ Successfully installed: {package}\n"
+        for package in failed_packages:
+            install_log += f"❌ Failed to install: {package}\n"
         
         summary = f"""
 System Packages Summary:
 ✅ Successful: {', '.join(successful_packages)}
 ❌ Failed: {', '.join(failed_packages)}
 """
-        return summary + "\n" + install_log
+        return summary + "\n" + install_log, not failed_packages
     
     except Exception as e:
-        error_msg = f"Error installing system packages: {str(e)}"
-        status_container.error(error_msg)
-        return error_msg
+        return f"Error installing system packages: {str(e)}", False
+
+def install_python_requirements(req_path):
+    """Install Python requirements with pip, returning (summary, ok)"""
+    # Skip pip entirely if these exact requirements were the last ones installed.
+    # All jobs share one site-packages, so only the most recent install counts.
+    with open(req_path, "rb") as f:
+        requirements_hash = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    try:
+        with open(PIP_MARKER_PATH, "r") as f:
+            if f.read() == requirements_hash:
+                return "Python requirements already installed.", True
+    except OSError:
+        pass
     
-    finally:
-        # Clean up
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+    # Whatever happens below changes site-packages, so drop the old marker first
+    try:
+        os.remove(PIP_MARKER_PATH)
+    except FileNotFoundError:
+        pass
+    
+    install_process = subprocess.run(
+        [sys.executable, "-m", "pip", "install", "--prefer-binary", "--disable-pip-version-check", "-r", req_path],
+        capture_output=True,
+        text=True,
+        env=get_subprocess_envs()["pip"]
+    )
+    
+    if install_process.returncode == 0:
+        ensure_dir(os.path.dirname(PIP_MARKER_PATH))
+        write_if_changed(PIP_MARKER_PATH, requirements_hash)
+        return "Python requirements installed successfully.", True
+    return f"Installation completed with return code: {install_process.returncode}\n{install_process.stderr}", False
+
+def iter_output_lines(stream):
+    """Yield batches of complete lines from a subprocess pipe as they arrive"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial_line = ""
+    ended_with_cr = False
+    fd = stream.fileno()
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        
+        text = decoder.decode(chunk)
+        # A \r\n pair split across two reads is still one line break
+        if ended_with_cr and text.startswith("\n"):
+            text = text[1:]
+        ended_with_cr = text.endswith("\r")
+        if not text:
+            continue
+        
+        lines = (partial_line + text).splitlines()
+        partial_line = "" if text.endswith(("\n", "\r")) else lines.pop()
+        if lines:
+            yield lines
+    
+    partial_line += decoder.decode(b"", final=True)
+    if partial_line:
+        yield [partial_line]
 
 def find_compiled_binary(output_dir, output_filename):
     """Find the compiled binary, checking different possible paths"""
@@ -459,77 +734,237 @@ def find_compiled_binary(output_dir, output_filename):
     if os.path.exists(dist_path):
         return dist_path
     
-    # Try using glob to find any executable
-    patterns = [
-        os.path.join(output_dir, "**", output_filename),
-        os.path.join(output_dir, "**", "user_script"),
-        os.path.join(output_dir, "**", "*.bin"),
-        os.path.join(output_dir, "**", "*.exe")
-    ]
+    # Walk the output tree once, breadth-first so shallower files win ties,
+    # ranking candidates by how specific the name is. Windows targets are
+    # rejected before compiling, so .exe files are never candidates.
+    best_path = None
+    best_rank = None
+    pending_dirs = deque([output_dir])
+    while pending_dirs:
+        try:
+            entries = os.scandir(pending_dirs.popleft())
+        except OSError:
+            continue
+        
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+                    continue
+                
+                name = entry.name
+                if name == output_filename:
+                    return entry.path
+                elif name == "user_script":
+                    rank = 1
+                elif name.endswith(".bin"):
+                    rank = 2
+                else:
+                    continue
+                
+                if best_rank is None or rank < best_rank:
+                    best_path = entry.path
+                    best_rank = rank
     
-    for pattern in patterns:
-        matches = glob.glob(pattern, recursive=True)
-        if matches:
-            return matches[0]
+    return best_path
+
+def identify_binary(binary_path):
+    """Identify the binary type from its magic bytes"""
+    with open(binary_path, "rb") as f:
+        head = f.read(4)
     
-    return None
+    if head == b"\x7fELF":
+        return f"{binary_path}: ELF executable ({os.path.getsize(binary_path)} bytes)"
+    if head[:2] == b"#!":
+        return f"{binary_path}: shell script"
+    return f"{binary_path}: unknown binary format"
 
-def run_compiled_binary(binary_path):
-    """Run the compiled binary and return the output"""
+def read_elf_dependencies(binary_path):
+    """Read the ELF headers, returning (is_dynamic, needed_libraries) or None if not ELF"""
+    # Parsing the headers directly avoids running ldd, which invokes the
+    # binary's own loader
     try:
-        # Make the binary executable
-        os.chmod(binary_path, 0o755)
-        
-        # Run the binary and capture output in real-time with a timeout
-        process = subprocess.Popen(
-            [binary_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        
-        # Create a placeholder for real-time output
-        output_placeholder = st.empty()
-        output_text = ""
-        
-        # Poll process for new output until finished
-        start_time = time.time()
-        while process.poll() is None:
-            # Check for timeout (10 seconds)
-            if time.time() - start_time > 10:
-                process.terminate()
-                return False, "Execution timed out after 10 seconds."
+        with open(binary_path, "rb") as f:
+            header = f.read(64)
+            if len(header) < 52 or header[:4] != b"\x7fELF":
+                return None
+            
+            is_64bit = header[4] == 2
+            endian = "<" if header[5] == 1 else ">"
+            if is_64bit:
+                phoff, = struct.unpack_from(endian + "Q", header, 32)
+                phentsize, phnum = struct.unpack_from(endian + "HH", header, 54)
+            else:
+                phoff, = struct.unpack_from(endian + "I", header, 28)
+                phentsize, phnum = struct.unpack_from(endian + "HH", header, 42)
             
-            # Read stdout
-            stdout_line = process.stdout.readline()
-            if stdout_line:
-                output_text += f"[STDOUT] {stdout_line}"
-                output_placeholder.text(output_text)
+            f.seek(phoff)
+            program_headers = f.read(phentsize * phnum)
             
-            # Read stderr
-            stderr_line = process.stderr.readline()
-            if stderr_line:
-                output_text += f"[STDERR] {stderr_line}"
-                output_placeholder.text(output_text)
+            is_dynamic = False
+            dynamic_segment = None
+            for index in range(phnum):
+                entry = index * phentsize
+                p_type, = struct.unpack_from(endian + "I", program_headers, entry)
+                if p_type == 3:  # PT_INTERP
+                    is_dynamic = True
+                elif p_type == 2:  # PT_DYNAMIC
+                    # (p_offset, p_filesz) of the dynamic section
+                    if is_64bit:
+                        dynamic_segment = (
+                            struct.unpack_from(endian + "Q", program_headers, entry + 8)[0],
+                            struct.unpack_from(endian + "Q", program_headers, entry + 32)[0]
+                        )
+                    else:
+                        dynamic_segment = (
+                            struct.unpack_from(endian + "I", program_headers, entry + 4)[0],
+                            struct.unpack_from(endian + "I", program_headers, entry + 16)[0]
+                        )
+            
+            if dynamic_segment is None:
+                return is_dynamic, 0
             
-            # Brief pause to prevent excessive CPU usage
-            time.sleep(0.1)
+            # Count DT_NEEDED entries up to DT_NULL
+            f.seek(dynamic_segment[0])
+            dynamic_data = f.read(dynamic_segment[1])
         
-        # Get remaining output
-        stdout, stderr = process.communicate()
-        if stdout:
-            output_text += f"[STDOUT] {stdout}"
-        if stderr:
-            output_text += f"[STDERR] {stderr}"
+        entry_format = endian + ("qQ" if is_64bit else "iI")
+        usable_length = len(dynamic_data) - len(dynamic_data) % struct.calcsize(entry_format)
+        needed_libraries = 0
+        for tag, _ in struct.iter_unpack(entry_format, dynamic_data[:usable_length]):
+            if tag == 0:  # DT_NULL
+                break
+            if tag == 1:  # DT_NEEDED
+                needed_libraries += 1
         
-        output_placeholder.text(output_text)
+        return is_dynamic or needed_libraries > 0, needed_libraries
+    except (OSError, struct.error):
+        # Truncated or malformed headers; the build itself still succeeded
+        return None
+
+def run_compiled_binary(binary_path, stream_output=False):
+    """Run the compiled binary and return the output"""
+    try:
+        # No chmod needed: compile_with_nuitka already made the binary
+        # executable, and binary_path only ever comes from its results
+        if stream_output:
+            return stream_compiled_binary(binary_path)
+        
+        # subprocess.run drains the pipe and blocks until exit, no polling.
+        # stderr shares the pipe so both streams stay in their real order.
+        try:
+            result = subprocess.run(
+                [binary_path],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                encoding="utf-8",
+                errors="replace",
+                timeout=10
+            )
+        except subprocess.TimeoutExpired as e:
+            # TimeoutExpired carries raw bytes even when an encoding was requested
+            partial_output = (e.stdout or b"").decode("utf-8", errors="replace")
+            return False, "Execution timed out after 10 seconds.\n" + partial_output
         
-        return True, output_text
+        return True, result.stdout
     except Exception as e:
         return False, f"Error running the binary: {str(e)}"
 
+def stream_compiled_binary(binary_path):
+    """Run the compiled binary, showing its output live as it arrives"""
+    # Run the binary and capture output in real-time with a timeout; stderr
+    # shares the pipe so both streams stay in their real order
+    process = subprocess.Popen(
+        [binary_path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0
+    )
+    
+    # Create a placeholder for real-time output
+    output_placeholder = st.empty()
+    output_parts = []
+    
+    # Wait for output with the remaining time budget. A non-blocking pipe
+    # lets each wakeup drain everything that is ready.
+    stdout_fd = process.stdout.fileno()
+    os.set_blocking(stdout_fd, False)
+    selector = selectors.DefaultSelector()
+    selector.register(stdout_fd, selectors.EVENT_READ)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    
+    def timed_out():
+        # Kill and reap the binary, keeping whatever it printed so far
+        process.kill()
+        process.wait()
+        output_parts.append(decoder.decode(b"", final=True))
+        return False, "Execution timed out after 10 seconds.\n" + "".join(output_parts)
+    
+    deadline = time.monotonic() + 10
+    last_flush = 0.0
+    has_new_output = False
+    try:
+        while selector.get_map():
+            # Check for timeout (10 seconds)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return timed_out()
+            
+            if selector.select(timeout=min(remaining, 0.25)):
+                chunks = []
+                while True:
+                    try:
+                        chunk = os.read(stdout_fd, 65536)
+                    except BlockingIOError:
+                        break
+                    if not chunk:
+                        selector.unregister(stdout_fd)
+                        break
+                    chunks.append(chunk)
+                
+                if chunks:
+                    output_parts.append(decoder.decode(b"".join(chunks)))
+                    has_new_output = True
+            
+            # Refresh the output at a bounded rate, and only when it changed
+            now = time.monotonic()
+            if has_new_output and now - last_flush >= 0.25:
+                last_flush = now
+                has_new_output = False
+                output_placeholder.text("".join(output_parts))
+    finally:
+        selector.close()
+        process.stdout.close()
+    
+    # The pipe is closed, wait for the exit within the remaining budget
+    try:
+        process.wait(timeout=max(deadline - time.monotonic(), 0))
+    except subprocess.TimeoutExpired:
+        return timed_out()
+    
+    output_parts.append(decoder.decode(b"", final=True))
+    output_text = "".join(output_parts)
+    output_placeholder.text(output_text)
+    
+    return True, output_text
+
+@st.fragment
+def render_download_button(binary_path, download_filename):
+    """Render the download button, only reading the binary once the user asks for it"""
+    # Binaries can be tens of MB, and Streamlit keeps download data in memory
+    # for as long as the button is shown, so defer loading until requested.
+    # Running as a fragment means only this block reruns on click.
+    if st.button("📦 Prepare Download", key="prepare_download", type="primary"):
+        with open(binary_path, "rb") as f:
+            data = f.read()
+        st.download_button(
+            "⬇️ Download Compiled Binary",
+            data=data,
+            file_name=download_filename,
+            mime="application/octet-stream",
+            type="primary"
+        )
+
 # App title and description
 st.title("🚀 Nuitka Python Compiler (Smart Compilation)")
 st.markdown("""
@@ -592,21 +1027,20 @@ with tab1:
             {'✨ **This binary should work on most compatible systems!**' if not results.get('has_static_libpython') else '🌟 **This static binary will work anywhere!**'}
             """)
             
-            # Stats
-            if results['binary_path'] and os.path.exists(results['binary_path']):
-                file_size = os.path.getsize(results['binary_path'])
+            # Stats (a single stat call both checks existence and gets the size)
+            file_size = None
+            if results['binary_path']:
+                try:
+                    file_size = os.stat(results['binary_path']).st_size
+                except FileNotFoundError:
+                    pass
+            
+            if file_size is not None:
                 st.metric("File Size", f"{file_size / 1024:.2f} KB")
                 
                 # Download
                 download_filename = f"compiled_program{results.get('output_extension', '.bin')}"
-                with open(results['binary_path'], "rb") as f:
-                    st.download_button(
-                        "⬇️ Download Compiled Binary",
-                        data=f,
-                        file_name=download_filename,
-                        mime="application/octet-stream",
-                        type="primary"
-                    )
+                render_download_button(results['binary_path'], download_filename)
                 
                 # Instructions based on static availability
                 if results.get('has_static_libpython'):
@@ -660,9 +1094,14 @@ with tab1:
                 
                 # Test run
                 st.subheader("🧪 Test Run (on Streamlit Cloud)")
+                stream_output = st.toggle(
+                    "Stream output",
+                    key="stream_output",
+                    help="Show the output live while the binary runs instead of all at once when it exits."
+                )
                 if st.button("Run Compiled Binary", key="run_button"):
                     with st.spinner("Executing..."):
-                        success, result = run_compiled_binary(results['binary_path'])
+                        success, result = run_compiled_binary(results['binary_path'], stream_output)
                     
                     if success:
                         st.success("✅ Execution successful!")
@@ -739,12 +1178,8 @@ print('Compilation was optimized for your environment!')""",
             # Compilation mode selection
             compilation_mode = st.selectbox(
                 "Compilation Mode",
-                options=[
-                    ("max_compatibility", "Maximum Compatibility (Recommended)"),
-                    ("portable", "Portable Binary"), 
-                    ("standalone", "Standalone Binary")
-                ],
-                format_func=lambda x: x[1],
+                options=list(COMPILE_MODES),
+                format_func=lambda mode: COMPILE_MODES[mode]["label"],
                 help="""
                 - Maximum Compatibility: Best settings for cross-system portability
                 - Portable Binary: Optimized binary but may need some system libraries
@@ -752,7 +1187,7 @@ print('Compilation was optimized for your environment!')""",
                 
                 All modes automatically use static libpython if available!
                 """
-            )[0]
+            )
             
             output_extension = st.selectbox(
                 "Output File Extension",
@@ -760,6 +1195,14 @@ print('Compilation was optimized for your environment!')""",
                 index=0
             )
             
+            has_clang = find_tool("clang") is not None
+            use_clang = st.checkbox(
+                "Use clang (faster)",
+                value=False,
+                disabled=not has_clang,
+                help="Compile the generated C code with clang instead of gcc." if has_clang else "clang is not installed."
+            )
+            
             # Show Python environment info
             st.info(f"📍 Compiling with Python {get_current_python_version()}")
             if check_static_libpython():
@@ -771,7 +1214,7 @@ print('Compilation was optimized for your environment!')""",
         if st.button("🚀 Compile with Nuitka", type="primary"):
             with st.spinner("Compiling with smart settings..."):
                 results = compile_with_nuitka(
-                    code, requirements, packages, target_platform, compilation_mode, output_extension
+                    code, requirements, packages, target_platform, compilation_mode, output_extension, use_clang
                 )
                 
                 # Store results in session state